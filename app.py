@@ -1,83 +1,130 @@
 import streamlit as st
-import os
 import time
 import json
-import tempfile
+import asyncio
+import io
+import hashlib
 import sqlite3
+import threading
 import pandas as pd
 import smtplib
 import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 import google.generativeai as genai
+from google.generativeai import client as genai_client
+from google.api_core import exceptions
+from pypdf import PdfReader, PdfWriter
+from typing_extensions import TypedDict  # pydantic needs this one on Python < 3.12
 
-# --- 1. CONFIG & CSS ---
+# --- 1. CONFIG ---
 st.set_page_config(
     page_title="Dastaavej - Property Safe Guard",
     page_icon="🏠",
     layout="centered"
 )
 
-st.markdown("""
-<style>
-    .blurred { filter: blur(5px); pointer-events: none; user-select: none; }
-    .pay-wall-overlay {
-        background-color: #f0f2f6; padding: 20px; border-radius: 10px;
-        text-align: center; border: 2px solid #ff4b4b; margin-top: 20px;
-    }
-    .stage-card {
-        padding: 15px; border-radius: 8px; border: 1px solid #e0e0e0;
-        margin-bottom: 10px; background-color: #ffffff;
-    }
-</style>
-""", unsafe_allow_html=True)
-
 # --- 2. BACKEND SETUP (Database & Email) ---
+@st.cache_resource
+def get_db():
+    conn = sqlite3.connect('dastavej_orders.db', check_same_thread=False, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    return conn
+
+@st.cache_resource
+def get_db_lock():
+    # Every session thread shares get_db()'s connection; hold this around each use so
+    # one session's statements never run inside another session's open transaction
+    return threading.Lock()
+
+# Cached so the schema DDL runs once per process, not on every rerun
+@st.cache_resource
 def init_db():
-    conn = sqlite3.connect('dastavej_orders.db')
-    c = conn.cursor()
-    c.execute('''
-        CREATE TABLE IF NOT EXISTS orders (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            doc_no TEXT,
-            doc_name TEXT,
-            customer_name TEXT,
-            contact_info TEXT,
-            request_date TIMESTAMP,
-            status TEXT,
-            stage_context TEXT
-        )
-    ''')
-    conn.commit()
-    conn.close()
+    with get_db_lock():
+        c = get_db().cursor()
+        c.execute('''
+            CREATE TABLE IF NOT EXISTS orders (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                doc_no TEXT,
+                doc_name TEXT,
+                customer_name TEXT,
+                contact_info TEXT,
+                request_date TIMESTAMP,
+                status TEXT,
+                stage_context TEXT
+            )
+        ''')
+        c.execute("CREATE INDEX IF NOT EXISTS idx_orders_date ON orders(request_date DESC)")
+    return True
 
 init_db()
 
 def log_request(doc_no, doc_name, name, contact, stage):
-    conn = sqlite3.connect('dastavej_orders.db')
-    c = conn.cursor()
     safe_doc_no = doc_no if doc_no else "MANUAL_SEARCH"
-    c.execute('''
-        INSERT INTO orders (doc_no, doc_name, customer_name, contact_info, request_date, status, stage_context)
-        VALUES (?, ?, ?, ?, ?, ?, ?)
-    ''', (safe_doc_no, doc_name, name, contact, datetime.now(), 'Pending', stage))
-    conn.commit()
-    conn.close()
-
-def update_order_status(order_id, new_status):
-    conn = sqlite3.connect('dastavej_orders.db')
-    c = conn.cursor()
-    c.execute("UPDATE orders SET status = ? WHERE id = ?", (new_status, order_id))
-    conn.commit()
-    conn.close()
-
-def send_confirmation_email(customer_email, customer_name, doc_name):
-    if "gmail_user" in st.secrets:
-        SENDER_EMAIL = st.secrets["gmail_user"]
-        SENDER_PASSWORD = st.secrets["gmail_pass"]
-    else:
-        return False 
+    with get_db_lock():
+        get_db().execute('''
+            INSERT INTO orders (doc_no, doc_name, customer_name, contact_info, request_date, status, stage_context)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', (safe_doc_no, doc_name, name, contact, datetime.now(), 'Pending', stage))
+
+@st.cache_data(ttl=5)
+def load_orders(page, page_size):
+    # Only the columns the editor shows; contact details are fetched per order
+    with get_db_lock():
+        return pd.read_sql_query(
+            "SELECT id, request_date, doc_name, status, stage_context FROM orders "
+            "ORDER BY request_date DESC LIMIT ? OFFSET ?",
+            get_db(), params=(page_size, (page - 1) * page_size), dtype_backend="pyarrow"
+        )
+
+def load_order_detail(order_id):
+    with get_db_lock():
+        row = get_db().execute(
+            "SELECT doc_no, customer_name, contact_info FROM orders WHERE id = ?", (order_id,)
+        ).fetchone()
+    return dict(zip(["doc_no", "customer_name", "contact_info"], row)) if row else None
+
+def status_updates(edited_df, orig_df):
+    # (new_status, order_id) for each row whose status differs from orig_df
+    changed = edited_df.merge(orig_df[['id', 'status']], on='id', suffixes=('_new', '_old'))
+    # Arrow-backed comparisons yield <NA> if a status was cleared; treat that as a change
+    mask = (changed['status_new'] != changed['status_old']).fillna(True)
+    # sqlite3 can't bind pd.NA, so a cleared status is written as NULL
+    return [
+        (None if pd.isna(status) else status, int(order_id))
+        for status, order_id in zip(changed.loc[mask, 'status_new'], changed.loc[mask, 'id'])
+    ]
+
+def update_order_statuses(updates):
+    # updates: iterable of (new_status, order_id), written in one transaction
+    conn = get_db()
+    with get_db_lock(), conn:
+        conn.execute("BEGIN")
+        conn.executemany("UPDATE orders SET status = ? WHERE id = ?", updates)
+
+def _smtp_connect(sender):
+    user, password = sender
+    server = smtplib.SMTP_SSL('smtp.gmail.com', 465)
+    server.login(user, password)
+    return server
+
+def _is_stale_session(e):
+    # Gmail drops idle sessions. Depending on timing smtplib reports that as
+    # SMTPServerDisconnected, as a 421 reply (SMTPSenderRefused, after it has
+    # already closed the socket) or as a bare socket error
+    return (
+        isinstance(e, smtplib.SMTPServerDisconnected)
+        or (isinstance(e, smtplib.SMTPResponseException) and e.smtp_code == 421)
+        or not isinstance(e, smtplib.SMTPException)
+    )
+
+def send_confirmation_email(mailer, sender, customer_email, customer_name, doc_name):
+    # Runs on the mailer's worker thread: no st.* calls here, sender is (user, password)
+    SENDER_EMAIL, SENDER_PASSWORD = sender
 
     try:
         msg = MIMEMultipart()
@@ -88,15 +135,26 @@ def send_confirmation_email(customer_email, customer_name, doc_name):
         body = f"""Hi {customer_name},\n\nWe received your request for: {doc_name}.\n\nOur team is verifying availability. We will contact you shortly.\n\n- Dastaavej Team"""
         msg.attach(MIMEText(body, 'plain'))
 
-        server = smtplib.SMTP('smtp.gmail.com', 587)
-        server.starttls()
-        server.login(SENDER_EMAIL, SENDER_PASSWORD)
-        server.send_message(msg)
-        server.quit()
+        if mailer["server"] is None or mailer["sender"] != sender:
+            mailer["server"], mailer["sender"] = _smtp_connect(sender), sender
+        try:
+            mailer["server"].send_message(msg)
+        except OSError as e:
+            if not _is_stale_session(e):
+                raise
+            # Reconnect once
+            mailer["server"] = _smtp_connect(sender)
+            mailer["server"].send_message(msg)
         return True
     except Exception as e:
         return False
 
+@st.cache_resource
+def _mailer():
+    # A single worker owns the one persistent SMTP session ("server"); only that
+    # thread ever touches it, since smtplib connections aren't thread-safe
+    return {"pool": ThreadPoolExecutor(max_workers=1), "server": None, "sender": None}
+
 # --- 3. POP-UP DIALOG (LEAD FORM) ---
 @st.dialog("Get Expert Help")
 def get_user_details(doc_no, doc_name, stage_context):
@@ -115,73 +173,188 @@ def get_user_details(doc_no, doc_name, stage_context):
             if name and email and phone:
                 log_request(doc_no, doc_name, name, f"{phone} | {email}", stage_context)
                 
-                with st.spinner("Sending confirmation..."):
-                    send_confirmation_email(email, name, doc_name)
+                # Fire-and-forget: the SMTP round-trips shouldn't hold the dialog open.
+                # Secrets are read here, on the script thread, not in the worker
+                if "gmail_user" in st.secrets:
+                    sender = (st.secrets["gmail_user"], st.secrets["gmail_pass"])
+                    mailer = _mailer()
+                    mailer["pool"].submit(send_confirmation_email, mailer, sender, email, name, doc_name)
                 
-                st.success("Request Sent! We will contact you shortly.")
-                time.sleep(2)
+                st.toast("Request Sent! We will contact you shortly.", icon="✅")
                 st.rerun()
             else:
                 st.error("All fields are required.")
 
 # --- 4. ADMIN DASHBOARD ---
+# A fragment, so paging and saving only rerun the dashboard
+@st.fragment
+def admin_fragment():
+    st.title("📋 Order Management")
+    page_size = 50
+    page = st.number_input("Page", min_value=1, step=1)
+
+    # Edits are positional, so while any are pending the editor must keep showing the
+    # exact frame they were made against. Otherwise reload, so new leads show up, and
+    # give a changed frame a new editor key so old edits never land on a different order
+    snapshot = st.session_state.get('admin_snapshot')
+    same_page = snapshot is not None and snapshot['page'] == page
+    pending = same_page and st.session_state.get(snapshot['key'], {}).get('edited_rows')
+    if not pending:
+        df = load_orders(page, page_size)
+        df['status'] = df['status'].fillna('Pending')
+        if not (same_page and df.equals(snapshot['df'])):
+            version = snapshot['version'] + 1 if snapshot else 0
+            snapshot = {'page': page, 'version': version, 'key': f"editor_{page}_{version}", 'df': df}
+            st.session_state['admin_snapshot'] = snapshot
+    df = snapshot['df']
+    
+    edited_df = st.data_editor(
+        df, key=snapshot['key'], hide_index=True, use_container_width=True,
+        disabled=["id", "request_date", "doc_name", "stage_context"]
+    )
+    st.caption("Type 'Completed' in status to update.")
+
+    order_id = st.selectbox("Order details", df['id'].tolist(), index=None, placeholder="Select an order ID")
+    if order_id is not None:
+        st.write(load_order_detail(int(order_id)))
+    
+    if st.button("💾 Save Changes"):
+        rows = status_updates(edited_df, df)
+        if rows:
+            update_order_statuses(rows)
+            load_orders.clear()
+        # Drop the snapshot so the next run reloads the page under a fresh editor key
+        st.session_state['admin_snapshot'] = {**snapshot, 'page': None}
+        st.success("Updated!")
+        time.sleep(1)
+        st.rerun(scope="fragment")
+
 def admin_dashboard():
     st.sidebar.markdown("---")
     st.sidebar.header("🔐 Admin Area")
     password = st.sidebar.text_input("Admin Password", type="password")
     
     if password == "admin123": 
-        st.title("📋 Order Management")
-        conn = sqlite3.connect('dastavej_orders.db')
-        df = pd.read_sql_query("SELECT * FROM orders ORDER BY request_date DESC", conn)
-        conn.close()
-
-        df['status'] = df['status'].fillna('Pending')
-        
-        edited_df = st.data_editor(
-            df, key="editor", hide_index=True, use_container_width=True,
-            disabled=["id", "doc_no", "doc_name", "customer_name", "contact_info", "stage_context"]
-        )
-        st.caption("Type 'Completed' in status to update.")
-        
-        if st.button("💾 Save Changes"):
-            for index, row in edited_df.iterrows():
-                update_order_status(row['id'], row['status'])
-            st.success("Updated!")
-            time.sleep(1)
-            st.rerun()
+        admin_fragment()
 
 # --- 5. AI ENGINE (DYNAMIC PROMPTS) ---
-def process_document(file_path, key, stage):
-    genai.configure(api_key=key)
-    model = genai.GenerativeModel("gemini-flash-latest") 
-    
-    with st.spinner(f"🔍 AI is analyzing for '{stage}' risks..."):
+class MissingDoc(TypedDict):
+    year: str
+    doc_type: str
+    doc_no: str
+    reason: str
+    risk_explained: str
+
+class GapReport(TypedDict):
+    property_summary: str
+    current_owner: str
+    risk_score: str
+    analysis_summary: str
+    missing_docs_list: list[MissingDoc]
+
+# Constrains Gemini to emit raw JSON in the GapReport shape (no fences to strip)
+REPORT_CONFIG = genai.GenerationConfig(response_mime_type="application/json", response_schema=GapReport)
+
+@st.cache_resource
+def get_model(api_key):
+    # Give the model a client built from its own key. Left alone it would latch whatever
+    # genai.configure() last set process-wide, which may be another visitor's key
+    manager = genai_client._ClientManager()
+    manager.configure(api_key=api_key)
+    model = genai.GenerativeModel("gemini-flash-latest")
+    model._client = manager.make_client("generative")
+    return model
+
+@st.cache_resource
+def _genai_config_lock():
+    return threading.Lock()
+
+def _with_key(key, fn, *args, **kwargs):
+    # upload_file/get_file only use the process-global client, so configure and call
+    # under one lock to keep another session's configure() from swapping the key
+    with _genai_config_lock():
+        genai.configure(api_key=key)
+        return fn(*args, **kwargs)
+
+@st.cache_data(show_spinner=False, max_entries=64)
+def extract_pdf_pages(pdf_bytes):
+    # One string per page ("" for a page with no text layer, e.g. a scan)
+    try:
+        reader = PdfReader(io.BytesIO(pdf_bytes))
+        return [p.extract_text() or "" for p in reader.pages]
+    except Exception:
+        # Unreadable text layer: let Gemini read the PDF itself
+        return []
+
+@st.cache_data(show_spinner=False, max_entries=16)
+def merge_pdfs(pdf_files):
+    # pdf_files: tuple of (file name, bytes). Cached so the same set of deeds always
+    # yields the same bytes (and cache key) downstream
+    writer = PdfWriter()
+    for name, blob in pdf_files:
         try:
-            g_file = genai.upload_file(file_path)
-            while g_file.state.name == "PROCESSING":
-                time.sleep(1)
-                g_file = genai.get_file(g_file.name)
-        except Exception as e:
-            return {"error": f"Upload Failed: {str(e)}"}
+            writer.append(io.BytesIO(blob))
+        except Exception:
+            # e.g. FileNotDecryptedError for a password-protected deed, PdfStreamError for a non-PDF
+            raise ValueError(f"Could not read '{name}'. Remove any password and upload it as a regular PDF.")
+    out = io.BytesIO()
+    writer.write(out)
+    return out.getvalue()
+
+@st.cache_resource
+def _gemini_files():
+    # (api_key, pdf sha256) -> uploaded File name; Gemini keeps uploads ~48h,
+    # so a stage change reuses the upload and only the prompt changes
+    return {}
+
+async def _upload_pdf(pdf_bytes, key):
+    files = _gemini_files()
+    cache_key = (key, hashlib.sha256(pdf_bytes).hexdigest())
+    if cache_key in files:
+        try:
+            g_file = await asyncio.to_thread(_with_key, key, genai.get_file, files[cache_key])
+            if g_file.state.name == "ACTIVE":
+                return g_file
+        except (exceptions.PermissionDenied, exceptions.NotFound):
+            pass  # expired server-side; upload again
+        files.pop(cache_key, None)
+
+    g_file = await asyncio.to_thread(
+        _with_key, key, genai.upload_file, io.BytesIO(pdf_bytes), mime_type="application/pdf"
+    )
+    delay = 0.1
+    deadline = time.monotonic() + 60
+    while g_file.state.name == "PROCESSING":
+        if time.monotonic() > deadline:
+            raise TimeoutError("Gemini is still processing the file after 60s")
+        await asyncio.sleep(delay)
+        delay = min(delay * 1.6, 2.0)
+        g_file = await asyncio.to_thread(_with_key, key, genai.get_file, g_file.name)
+    files[cache_key] = g_file.name
+    return g_file
+
+async def _process_async(pdf_bytes, key, stage, text=None):
+    model = get_model(key)
+    
+    if text:
+        doc_part = text
+    else:
+        with st.spinner(f"🔍 AI is analyzing for '{stage}' risks..."):
+            try:
+                g_file = await _upload_pdf(pdf_bytes, key)
+            except Exception as e:
+                return {"error": f"Upload Failed: {str(e)}"}
+        doc_part = g_file
             
     # --- DYNAMIC PROMPT LOGIC ---
-    base_structure = """
-    {
-      "property_summary": "Short location description",
-      "current_owner": "Name",
-      "risk_score": "Low/Medium/High",
-      "analysis_summary": "2 sentences summarizing the overall safety of this deal.",
-      "missing_docs_list": [
-        {
-            "year": "YYYY", 
-            "doc_type": "Sale Deed/Will/Gift", 
-            "doc_no": "str", 
-            "reason": "Why is it missing?",
-            "risk_explained": "Legal implication of missing this file."
-        }
-      ]
-    }
+    # The JSON shape comes from REPORT_CONFIG; this only says what goes in each field
+    field_guide = """
+    - property_summary: Short location description
+    - current_owner: Name
+    - risk_score: Low/Medium/High
+    - analysis_summary: 2 sentences summarizing the overall safety of this deal.
+    - missing_docs_list: one entry per missing deed with year (YYYY), doc_type (Sale Deed/Will/Gift),
+      doc_no, reason (why is it missing?) and risk_explained (legal implication of missing this file).
     """
     
     if stage == "Negotiation":
@@ -195,8 +368,7 @@ def process_document(file_path, key, stage):
     Analyze this Property Document for a user in the '{stage}' stage.
     {focus}
     
-    Return strictly valid JSON. Do not use Markdown.
-    Structure: {base_structure}
+    Fields: {field_guide}
     
     Rules: 
     1. If a document is mentioned in 'Recitals' (History) but NOT uploaded, it is MISSING.
@@ -204,12 +376,49 @@ def process_document(file_path, key, stage):
     """
     
     try:
-        response = model.generate_content([prompt, g_file])
-        cleaned_text = response.text.replace("```json", "").replace("```", "").strip()
-        return json.loads(cleaned_text)
+        placeholder = st.empty()
+        for attempt in range(3):
+            try:
+                # The SDK's grpc.aio client is bound to the first event loop it sees and
+                # asyncio.run() makes a new one per click, so blocking calls go to threads.
+                stream = await asyncio.to_thread(
+                    model.generate_content, [prompt, doc_part], stream=True, generation_config=REPORT_CONFIG
+                )
+                chunks = iter(stream)
+                buf = ""
+                while (chunk := await asyncio.to_thread(next, chunks, None)) is not None:
+                    buf += chunk.text
+                    # Progress only: the tail of the stream is missing_docs_list, the paid content
+                    placeholder.caption(f"Receiving analysis… {len(buf)} chars")
+                break
+            except exceptions.ResourceExhausted:
+                # Rate limited (429): back off and regenerate from scratch
+                if attempt == 2:
+                    raise
+                await asyncio.sleep(2 ** (attempt + 1))
+            finally:
+                # Don't leave a half-streamed preview behind if the stream dies
+                placeholder.empty()
+        return json.loads(buf)
     except Exception as e:
         return {"error": f"AI Failed: {str(e)}"}
 
+def process_document(pdf_bytes, key, stage, text=None):
+    return asyncio.run(_process_async(pdf_bytes, key, stage, text))
+
+@st.cache_data(show_spinner=False, ttl=3600, max_entries=64)
+def process_document_cached(pdf_bytes, stage, api_key):
+    # Keyed on the PDF content, so re-analyzing the same file is a cache hit
+    pages = extract_pdf_pages(pdf_bytes)
+    text = "\n".join(pages)
+    # Only when every page has a text layer: a merged upload can mix a native deed with
+    # scanned ones, and sending just the text would make the scans look MISSING
+    if pages and all(p.strip() for p in pages) and len(text.strip()) > 500:
+        # Native text PDF: send the text and skip the upload/processing round-trip
+        return process_document(None, api_key, stage, text=text)
+
+    return process_document(pdf_bytes, api_key, stage)
+
 # --- 6. MAIN APP FLOW ---
 with st.sidebar:
     st.success("✅ System Ready")
@@ -245,54 +454,74 @@ elif "Token" in stage_selection:
     st.info("ℹ️ **Goal:** Find missing historical links before you pay the advance.")
 else:
     current_stage = "Loan Application"
-    upload_label = "Upload All Available Deeds (Merged PDF)"
+    upload_label = "Upload All Available Deeds (one merged PDF or several files)"
     st.error("ℹ️ **Goal:** Strict Bank-Level Verification. Zero tolerance for gaps.")
 
 # === STEP 2: UPLOAD ===
-uploaded_file = st.file_uploader(upload_label, type=["pdf"])
+# Loan checks review the whole chain, so accept every deed at once
+uploaded_file = st.file_uploader(
+    upload_label, type=["pdf"], accept_multiple_files=(current_stage == "Loan Application")
+)
 
 # Session State
-if "analysis_result" not in st.session_state:
-    st.session_state.analysis_result = None
 if "is_paid" not in st.session_state:
     st.session_state.is_paid = False
+if "view" not in st.session_state:
+    st.session_state.view = None
 
 # === STEP 3: ANALYZE ===
 if st.button(f"Analyze for {current_stage}"):
     if not uploaded_file or not api_key:
         st.error("⚠️ Upload file and enter API Key.")
     else:
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp:
-            tmp.write(uploaded_file.getvalue())
-            tmp_path = tmp.name
-        
-        result = process_document(tmp_path, api_key, current_stage)
+        try:
+            if isinstance(uploaded_file, list):
+                # Analyze the deeds together: a deed in one file must not be flagged missing from another
+                files = tuple((f.name, f.getvalue()) for f in uploaded_file)
+                pdf_bytes = files[0][1] if len(files) == 1 else merge_pdfs(files)
+            else:
+                pdf_bytes = uploaded_file.getvalue()
+        except ValueError as e:
+            result = {"error": f"Upload Failed: {str(e)}"}
+        else:
+            result = process_document_cached(pdf_bytes, current_stage, api_key)
+            if "error" in result:
+                # Don't let a failed run stick in the cache
+                process_document_cached.clear(pdf_bytes, current_stage, api_key)
         if "error" in result:
             st.error(result["error"])
         else:
-            st.session_state.analysis_result = result
-        os.remove(tmp_path)
+            # Derive display fields once; the results block reads these on every rerun
+            docs = result.get('missing_docs_list', [])
+            st.session_state.view = {
+                "summary": result.get('analysis_summary', 'Analysis Complete.'),
+                "property": result.get('property_summary', 'N/A'),
+                "risk_score": result.get('risk_score', 'Unknown'),
+                "docs": docs,
+                "count": len(docs),
+            }
 
 # === STEP 4: RESULTS ===
-if st.session_state.analysis_result:
-    res = st.session_state.analysis_result
+# A fragment, so unlocking only reruns the report instead of the whole script
+@st.fragment
+def results_fragment(view, current_stage):
     st.divider()
     
     # Summary Section
     st.subheader(f"📊 {current_stage} Report")
-    st.write(f"**Analysis:** {res.get('analysis_summary', 'Analysis Complete.')}")
+    st.write(f"**Analysis:** {view['summary']}")
     
     colA, colB = st.columns(2)
-    colA.info(f"**Property:** {res.get('property_summary', 'N/A')}")
-    colB.metric("Risk Score", res.get('risk_score', 'Unknown'))
+    colA.info(f"**Property:** {view['property']}")
+    colB.metric("Risk Score", view['risk_score'])
 
     # The Gaps
-    count = res.get('missing_docs_count', len(res.get('missing_docs_list', [])))
+    count = view['count']
     
     if st.session_state.is_paid:
         # UNLOCKED VIEW
         st.subheader("🔓 Critical Issues Found")
-        documents = res.get('missing_docs_list', [])
+        documents = view['docs']
         
         if not documents:
             st.success("✅ No critical gaps found for this stage.")
@@ -320,17 +549,28 @@ if st.session_state.analysis_result:
         # LOCKED VIEW
         st.error(f"⚠️ Found {count} Risks affecting your {current_stage}.")
         
-        st.markdown(f"""
+        # The overlay is the only styled element, so its CSS ships with it
+        # rather than as a page-wide block on every rerun
+        st.html(f"""
+        <style>
+            .pay-wall-overlay {{
+                background-color: #f0f2f6; padding: 20px; border-radius: 10px;
+                text-align: center; border: 2px solid #ff4b4b; margin-top: 20px;
+            }}
+        </style>
         <div class="pay-wall-overlay">
             <h3>⚠️ Reveal {count} Hidden Risks</h3>
             <p>Don't proceed with {current_stage} blindly.</p>
         </div>
-        """, unsafe_allow_html=True)
+        """)
         
         if st.button(f"🔓 Unlock Report for ₹99"):
             with st.spinner("Processing Payment..."):
                 time.sleep(1)
                 st.session_state.is_paid = True
-                st.rerun()
+                st.rerun(scope="fragment")
     else:
-        st.success(f"✅ Your {current_stage} check looks clean!")
\ No newline at end of file
+        st.success(f"✅ Your {current_stage} check looks clean!")
+
+if st.session_state.view:
+    results_fragment(st.session_state.view, current_stage)
\ No newline at end of file
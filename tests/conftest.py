@@ -0,0 +1,34 @@
+import importlib
+import os
+import sys
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(scope="session")
+def app_import(tmp_path_factory):
+    # app.py is a Streamlit script: importing it runs the page in bare mode, which
+    # needs a secrets file and creates the orders DB in the working directory
+    workdir = tmp_path_factory.mktemp("app")
+    (workdir / ".streamlit").mkdir()
+    (workdir / ".streamlit" / "secrets.toml").write_text('GOOGLE_API_KEY = "test-key"\n')
+
+    # Third-party imports aren't the app's own load cost; do them before timing
+    import google.generativeai, pandas, pypdf, streamlit  # noqa: F401
+
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        start = time.perf_counter()
+        module = importlib.import_module("app")
+        yield module, time.perf_counter() - start
+    finally:
+        os.chdir(cwd)
+
+
+@pytest.fixture(scope="session")
+def app(app_import):
+    return app_import[0]
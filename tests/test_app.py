@@ -0,0 +1,105 @@
+import io
+import smtplib
+import sqlite3
+
+import pandas as pd
+import pytest
+from pypdf import PdfReader, PdfWriter
+
+
+def _pdf(encrypt=False):
+    writer = PdfWriter()
+    writer.add_blank_page(100, 100)
+    if encrypt:
+        writer.encrypt("secret")
+    out = io.BytesIO()
+    writer.write(out)
+    return out.getvalue()
+
+
+def _orders(statuses):
+    return pd.DataFrame(
+        {"id": range(1, len(statuses) + 1), "status": statuses}
+    ).convert_dtypes(dtype_backend="pyarrow")
+
+
+def test_import_smoke(app_import):
+    app, seconds = app_import
+    assert callable(app.process_document_cached)
+    assert seconds < 1
+
+
+def test_status_updates_unchanged(app):
+    df = _orders(["Pending", "Completed"])
+    assert app.status_updates(df.copy(), df) == []
+
+
+def test_status_updates_changed_rows_only(app):
+    orig = _orders(["Pending", "Pending", "Pending"])
+    edited = orig.copy()
+    edited.loc[1, "status"] = "Completed"
+    assert app.status_updates(edited, orig) == [("Completed", 2)]
+
+
+def test_status_updates_cleared_status_binds_as_null(app):
+    orig = _orders(["Pending", "Pending"])
+    edited = orig.copy()
+    edited.loc[0, "status"] = None
+    rows = app.status_updates(edited, orig)
+    assert rows == [(None, 1)]
+
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE TABLE orders (id INTEGER PRIMARY KEY, status TEXT)")
+    conn.executemany("INSERT INTO orders VALUES (?, ?)", [(1, "Pending"), (2, "Pending")])
+    conn.executemany("UPDATE orders SET status = ? WHERE id = ?", rows)
+    assert conn.execute("SELECT status FROM orders ORDER BY id").fetchall() == [(None,), ("Pending",)]
+
+
+@pytest.mark.parametrize("error, stale", [
+    (smtplib.SMTPServerDisconnected("gone"), True),
+    (smtplib.SMTPSenderRefused(421, b"4.4.2 Timeout", "me@example.com"), True),
+    (ConnectionResetError(), True),
+    (smtplib.SMTPSenderRefused(550, b"5.7.1 Rejected", "me@example.com"), False),
+    (smtplib.SMTPRecipientsRefused({}), False),
+])
+def test_is_stale_session(app, error, stale):
+    assert app._is_stale_session(error) is stale
+
+
+class _FakeServer:
+    def __init__(self, error=None):
+        self.error = error
+        self.sent = []
+
+    def send_message(self, msg):
+        if self.error:
+            raise self.error
+        self.sent.append(msg)
+
+
+def test_send_confirmation_email_reconnects_after_idle_timeout(app, monkeypatch):
+    dead = _FakeServer(smtplib.SMTPSenderRefused(421, b"4.4.2 Timeout", "me@example.com"))
+    fresh = _FakeServer()
+    monkeypatch.setattr(app, "_smtp_connect", lambda sender: fresh)
+    sender = ("me@example.com", "pw")
+    mailer = {"server": dead, "sender": sender}
+
+    assert app.send_confirmation_email(mailer, sender, "lead@example.com", "Lead", "1998 Sale Deed")
+    assert mailer["server"] is fresh
+    assert fresh.sent[0]["To"] == "lead@example.com"
+
+
+def test_merge_pdfs(app):
+    merged = app.merge_pdfs((("a.pdf", _pdf()), ("b.pdf", _pdf())))
+    assert len(PdfReader(io.BytesIO(merged)).pages) == 2
+
+
+@pytest.mark.parametrize("blob", [_pdf(encrypt=True), b"not a pdf"])
+def test_merge_pdfs_names_unreadable_file(app, blob):
+    with pytest.raises(ValueError, match="bad.pdf"):
+        app.merge_pdfs((("good.pdf", _pdf()), ("bad.pdf", blob)))
+
+
+def test_extract_pdf_pages_reports_pages_without_text(app):
+    assert app.extract_pdf_pages(_pdf()) == [""]
+    assert app.extract_pdf_pages(b"not a pdf") == []